@@ -0,0 +1,354 @@
+"""Local fast path for SplitSense messages.
+
+Most chat messages follow the shapes in the Quick Guide ("I paid ₹500 for
+tickets", "Split ₹800 among 3 people", "Rahul owes me ₹250", "Rahul paid
+me ₹200", "What's everyone's balance?"). Those are parsed here and answered straight from a
+ledger replayed out of the room's message history; anything the parser is
+not confident about returns None so the caller can send it to Gemini.
+"""
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+PAYMENT = 'payment'
+DEBT = 'debt'
+SETTLEMENT = 'settlement'
+BALANCE = 'balance'
+
+DEFAULT_THRESHOLD = float(os.environ.get('POCKETTRIP_PARSER_THRESHOLD', 0.8))
+
+NUMBER_WORDS = {
+    'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
+}
+SELF_WORDS = {'i', 'me', 'myself'}
+SELF_REFERENCE = re.compile(r"\b(?:me|my|mine|myself)\b", re.IGNORECASE)
+PRONOUNS = {'me', 'my', 'mine', 'myself', 'us', 'our', 'him', 'his', 'her', 'them', 'their', 'you', 'your'}
+
+_NUMBER = r'(\d[\d,]*(?:\.\d+)?)(\s*k\b)?'
+AMOUNT_PATTERNS = [
+    re.compile(r'(?:₹|\brs\.?|\binr)\s*' + _NUMBER, re.IGNORECASE),
+    re.compile(_NUMBER + r'\s*(?:rupees|rs\b\.?|inr\b|/-)', re.IGNORECASE)
+]
+BARE_NUMBER = re.compile(r'(?<![\w.])' + _NUMBER + r'(?![\w%])', re.IGNORECASE)
+COUNT_PATTERN = re.compile(
+    r'\b(?:among|between|by|for|with)\s+(?:the\s+)?(\d+|' + '|'.join(NUMBER_WORDS) + r')\s+'
+    r'(?:people|persons|person|of us|friends|members|ppl|ways)\b',
+    re.IGNORECASE
+)
+EVERYONE_PATTERN = re.compile(r'\b(?:equally|everyone|everybody|all of us|the group|whole group)\b', re.IGNORECASE)
+GROUP_CLAUSE = re.compile(r'\b(?:among|between|with)\b(.*)$', re.IGNORECASE)
+BALANCE_PATTERN = re.compile(
+    r"\b(?:balances?|who owes (?:whom|who|what)|how much (?:do|does|did) \w+ owe|settle(?:ment)?s?|"
+    r"summary|where do we stand|what do (?:i|we) owe)\b",
+    re.IGNORECASE
+)
+PAYER_PATTERN = re.compile(r"^\s*(?P<payer>[\w.'-]+)\s+(?:paid|spent|covered|bought|gave)\b", re.IGNORECASE)
+# Money handed to a person ("Rahul paid me ₹200", "I gave ₹200 to Rahul") repays a debt
+SETTLEMENT_VERBS = r"(?:paid|gave|sent|transferred|repaid)"
+SETTLEMENT_PATTERNS = [
+    re.compile(r"^\s*(?P<payer>[\w.'-]+)\s+" + SETTLEMENT_VERBS + r"\s+(?P<recipient>[\w.'-]+)\b", re.IGNORECASE),
+    re.compile(r"^\s*(?P<payer>[\w.'-]+)\s+" + SETTLEMENT_VERBS + r"\b.*?\bto\s+(?P<recipient>[\w.'-]+)\b", re.IGNORECASE)
+]
+DEBT_PATTERN = re.compile(r"^\s*(?P<debtor>[\w.'-]+)\s+owes?\s+(?P<creditor>[\w.'-]+)\b", re.IGNORECASE)
+SPLIT_PATTERN = re.compile(r'^\s*split\b', re.IGNORECASE)
+DESCRIPTION_PATTERN = re.compile(r'\bfor\s+(?!\d|' + '|'.join(NUMBER_WORDS) + r'\b)([^,.!?]+?)(?=\s*(?:,|\.|!|\?|$|\bfor\b|\bsplit\b|\bamong\b|\bbetween\b|\bwith\b))', re.IGNORECASE)
+# Anything with these needs judgement the parser doesn't have
+HEDGE_PATTERN = re.compile(
+    r"\b(?:except|excluding|not|but|refund(?:ed)?|returned|paid back|half|more|less|instead|"
+    r"wrong|undo|cancel|each|per person|twice|sorry|actually|own|personal|for myself)\b|%",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class ParsedMessage:
+    intent: str
+    confidence: float
+    amount: float = 0.0
+    payer: str = None
+    participants: list = field(default_factory=list)
+    debtor: str = None
+    creditor: str = None
+    recipient: str = None
+    description: str = None
+    # True when the cost is shared by whoever is in the room, rather than by named members
+    whole_room: bool = False
+
+
+def format_inr(amount):
+    text = f"{amount:,.2f}"
+    return f"₹{text[:-3] if text.endswith('.00') else text}"
+
+
+def _to_amount(number, thousands):
+    value = float(number.replace(',', ''))
+    return value * 1000 if thousands else value
+
+
+def extract_amounts(message):
+    for pattern in AMOUNT_PATTERNS:
+        amounts = [_to_amount(m.group(1), m.group(2)) for m in pattern.finditer(message)]
+        if amounts:
+            return amounts, True
+    # A bare number could just as well be a count or a time, so it is only a guess
+    without_counts = COUNT_PATTERN.sub('', message)
+    return [_to_amount(m.group(1), m.group(2)) for m in BARE_NUMBER.finditer(without_counts)], False
+
+
+def _name_aliases(username):
+    # "rahul_k" should answer to "Rahul" as well as to its full username
+    aliases = {username.lower()}
+    first = re.split(r'[^0-9a-zA-Z]+', username)[0].lower()
+    if first:
+        aliases.add(first)
+    return aliases
+
+
+def match_member(token, sender, member_names):
+    token = re.sub(r"'s$", '', token.lower()).strip(".'")
+    if token in SELF_WORDS:
+        return sender
+    matches = [name for name in member_names if token in _name_aliases(name)]
+    return matches[0] if len(matches) == 1 else None
+
+
+def mentioned_members(text, member_names):
+    words = set(re.findall(r"[\w.-]+", text.lower()))
+    return [name for name in member_names if _name_aliases(name) & words]
+
+
+def extract_description(message):
+    # "for me ₹200" names who benefited, and "for ₹150" only the amount
+    for match in DESCRIPTION_PATTERN.finditer(message):
+        text = match.group(1)
+        for pattern in AMOUNT_PATTERNS:
+            text = pattern.sub('', text)
+        text = ' '.join(text.split())
+        if text and text.lower() not in PRONOUNS:
+            return text
+    return None
+
+
+def parse_message(message, sender, member_names):
+    member_names = list(member_names)
+    if sender not in member_names:
+        member_names.append(sender)
+    amounts, explicit = extract_amounts(message)
+
+    if not amounts and BALANCE_PATTERN.search(message):
+        return ParsedMessage(BALANCE, 0.95)
+    if len(amounts) != 1 or amounts[0] <= 0:
+        return None
+    amount = amounts[0]
+    confidence = 0.95 if explicit else 0.7
+    if HEDGE_PATTERN.search(message):
+        confidence = min(confidence, 0.4)
+
+    debt = DEBT_PATTERN.match(message)
+    if debt:
+        debtor = match_member(debt.group('debtor'), sender, member_names)
+        creditor = match_member(debt.group('creditor'), sender, member_names)
+        if not debtor or not creditor or debtor == creditor:
+            return None
+        return ParsedMessage(DEBT, confidence, amount, debtor=debtor, creditor=creditor)
+
+    for pattern in SETTLEMENT_PATTERNS:
+        settlement = pattern.match(message)
+        # "I paid Rahul's cab fare" names whose expense it was, not who got the money
+        if not settlement or settlement.group('recipient').lower().endswith("'s"):
+            continue
+        recipient = match_member(settlement.group('recipient'), sender, member_names)
+        if recipient:
+            payer = match_member(settlement.group('payer'), sender, member_names)
+            if not payer or payer == recipient:
+                return None
+            return ParsedMessage(SETTLEMENT, confidence, amount, payer=payer, recipient=recipient)
+
+    payer_match = PAYER_PATTERN.match(message)
+    if payer_match:
+        payer = match_member(payer_match.group('payer'), sender, member_names)
+        if not payer:
+            return None
+    elif SPLIT_PATTERN.match(message):
+        payer = sender
+        confidence = min(confidence, 0.9)
+    else:
+        return None
+
+    count_match = COUNT_PATTERN.search(message)
+    group_clause = GROUP_CLAUSE.search(message)
+    named = mentioned_members(group_clause.group(1), member_names) if group_clause else []
+    if count_match:
+        count = count_match.group(1).lower()
+        count = NUMBER_WORDS.get(count) or int(count)
+        # A head count only says who shares the cost when it is the whole room
+        if count != len(member_names):
+            confidence = min(confidence, 0.5)
+        participants = list(member_names)
+        whole_room = True
+    elif named:
+        participants = named if payer in named else [payer] + named
+        confidence = min(confidence, 0.85)
+        whole_room = False
+    else:
+        others = [name for name in mentioned_members(message, member_names) if name != payer]
+        # "Rahul paid for me" names the sender the same way "for Priya" names Priya
+        if payer != sender and payer_match and SELF_REFERENCE.search(message[payer_match.end():]):
+            others.append(sender)
+        if others and not EVERYONE_PATTERN.search(message):
+            # "I paid ₹300 for Rahul's cab" might mean Rahul owes all of it
+            confidence = min(confidence, 0.5)
+        participants = list(member_names)
+        whole_room = True
+
+    return ParsedMessage(
+        PAYMENT, confidence, amount, payer=payer, participants=participants,
+        description=extract_description(message), whole_room=whole_room
+    )
+
+
+def apply_to_balances(balances, parsed):
+    if parsed.intent == PAYMENT:
+        share = parsed.amount / len(parsed.participants)
+        balances[parsed.payer] = balances.get(parsed.payer, 0.0) + parsed.amount
+        for name in parsed.participants:
+            balances[name] = balances.get(name, 0.0) - share
+    elif parsed.intent == DEBT:
+        balances[parsed.creditor] = balances.get(parsed.creditor, 0.0) + parsed.amount
+        balances[parsed.debtor] = balances.get(parsed.debtor, 0.0) - parsed.amount
+    elif parsed.intent == SETTLEMENT:
+        balances[parsed.payer] = balances.get(parsed.payer, 0.0) + parsed.amount
+        balances[parsed.recipient] = balances.get(parsed.recipient, 0.0) - parsed.amount
+
+
+def members_at(member_names, activity, when):
+    # member_names is in join order, as rooms.members stores it, and activity
+    # is [(name, timestamp), ...]. Joins aren't timestamped, but anyone active
+    # by `when` had joined by then, and so had everyone ahead of them
+    joined = [member_names.index(name) for name, at in activity if at <= when and name in member_names]
+    return member_names[:max(joined) + 1] if joined else []
+
+
+def compute_balances(history, member_names, threshold=DEFAULT_THRESHOLD):
+    # history is [(sender, message), ...] oldest first, optionally with the
+    # members known to be in the room at the time as a third item (see
+    # members_at); without it everyone is assumed to have been there from the
+    # start. Balances can only be trusted if every expense in it was
+    # understood, so one unparsed message means the ledger is unknown
+    balances = {name: 0.0 for name in member_names}
+    for sender, message, *joined in history:
+        parsed = parse_message(message, sender, member_names)
+        if parsed is None:
+            if extract_amounts(message)[0]:
+                return None
+            continue
+        if parsed.confidence < threshold:
+            return None
+        # A cost shared by the whole room can't be charged to someone who may have joined after it
+        if parsed.whole_room and joined and set(member_names) - set(joined[0]):
+            return None
+        apply_to_balances(balances, parsed)
+    return balances
+
+
+def settle(balances):
+    # Greedily match the largest debtor with the largest creditor; this keeps
+    # the number of payments to at most one fewer than the number of people
+    creditors = sorted(((amt, name) for name, amt in balances.items() if amt > 0.005), reverse=True)
+    debtors = sorted(((-amt, name) for name, amt in balances.items() if amt < -0.005), reverse=True)
+    payments = []
+    i = j = 0
+    while i < len(debtors) and j < len(creditors):
+        owed, debtor = debtors[i]
+        due, creditor = creditors[j]
+        paid = min(owed, due)
+        payments.append((debtor, creditor, round(paid, 2)))
+        debtors[i] = (owed - paid, debtor)
+        creditors[j] = (due - paid, creditor)
+        if debtors[i][0] <= 0.005:
+            i += 1
+        if creditors[j][0] <= 0.005:
+            j += 1
+    return payments
+
+
+def describe_balances(balances):
+    lines = ["**Running balances:**"]
+    for name, amount in sorted(balances.items()):
+        if amount > 0.005:
+            lines.append(f"- {name} gets back {format_inr(amount)}")
+        elif amount < -0.005:
+            lines.append(f"- {name} owes {format_inr(-amount)}")
+        else:
+            lines.append(f"- {name} is settled up")
+    payments = settle(balances)
+    if payments:
+        lines.append("")
+        lines.append("**To settle up:**")
+        lines.extend(f"- {debtor} pays {creditor} {format_inr(amount)}" for debtor, creditor, amount in payments)
+    return "\n".join(lines)
+
+
+def describe(parsed):
+    if parsed.intent == DEBT:
+        return f"Noted! {parsed.debtor} owes {parsed.creditor} {format_inr(parsed.amount)}."
+    if parsed.intent == SETTLEMENT:
+        return f"Noted! {parsed.payer} paid {parsed.recipient} {format_inr(parsed.amount)}."
+    share = parsed.amount / len(parsed.participants)
+    what = f" for {parsed.description}" if parsed.description else ""
+    lines = [
+        f"Got it! {parsed.payer} paid {format_inr(parsed.amount)}{what}, split among "
+        f"{len(parsed.participants)} people = {format_inr(share)} each."
+    ]
+    lines.extend(f"- {name} owes {parsed.payer} {format_inr(share)}" for name in parsed.participants if name != parsed.payer)
+    return "\n".join(lines)
+
+
+class FastPath:
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.local = 0
+        self.fallback = 0
+        self.by_intent = {}
+        self._lock = threading.Lock()
+
+    def _count(self, intent):
+        with self._lock:
+            if intent is None:
+                self.fallback += 1
+            else:
+                self.local += 1
+                self.by_intent[intent] = self.by_intent.get(intent, 0) + 1
+
+    def respond(self, message, sender, member_names, history):
+        # Returns a reply, or None when the message should go to the model
+        parsed = parse_message(message, sender, member_names)
+        if parsed is None or parsed.confidence < self.threshold:
+            self._count(None)
+            return None
+
+        balances = compute_balances(history, member_names, self.threshold)
+        if parsed.intent == BALANCE:
+            if balances is None:
+                self._count(None)
+                return None
+            self._count(BALANCE)
+            return describe_balances(balances)
+
+        reply = describe(parsed)
+        if balances is not None:
+            apply_to_balances(balances, parsed)
+            reply += "\n\n" + describe_balances(balances)
+        self._count(parsed.intent)
+        return reply
+
+    def stats(self):
+        total = self.local + self.fallback
+        return {
+            'local': self.local,
+            'fallback': self.fallback,
+            'by_intent': dict(self.by_intent),
+            'hit_rate': self.local / total if total else 0.0
+        }
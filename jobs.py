@@ -0,0 +1,108 @@
+"""Background jobs for slow model calls.
+
+Plan generation and merging used to run inline on the Streamlit script
+thread, so a rerun mid-call either abandoned the work or started it again.
+Jobs run on a bounded thread pool instead and their status and results are
+kept in the shared cache, so any rerun, worker or room member can look them
+up by id.
+
+A job id is derived from its kind, scope (usually the room) and parameters,
+so submitting the same work twice while it is still queued or running hands
+back the existing job instead of starting a new one.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+PENDING_STATUSES = (QUEUED, RUNNING)
+
+# An in-flight record outlives its worker only this long, so a job orphaned
+# by a crashed process can be resubmitted
+IN_FLIGHT_TTL = 900
+RESULT_TTL = 3600
+
+
+class JobQueue:
+    def __init__(self, cache, max_workers=None):
+        self.cache = cache
+        self.max_workers = max_workers or int(os.environ.get('POCKETTRIP_JOB_WORKERS', 4))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pockettrip-job')
+        self._lock = threading.Lock()
+        self._active = 0
+
+    @staticmethod
+    def job_id(kind, scope, params):
+        payload = json.dumps([kind, scope, params], sort_keys=True, default=str)
+        return f"{kind}-{hashlib.sha256(payload.encode()).hexdigest()[:16]}"
+
+    def get(self, job_id):
+        if not job_id:
+            return None
+        return self.cache.get('job', job_id)
+
+    def latest(self, kind, scope):
+        return self.get(self.cache.get('job_latest', scope, kind))
+
+    def active_count(self):
+        with self._lock:
+            return self._active
+
+    def submit(self, kind, scope, params, fn, *args, **kwargs):
+        job_id = self.job_id(kind, scope, params)
+        record = {
+            'id': job_id,
+            'kind': kind,
+            'scope': scope,
+            'status': QUEUED,
+            'result': None,
+            'error': None,
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None
+        }
+
+        if not self.cache.add('job', job_id, '', record, ttl=IN_FLIGHT_TTL):
+            existing = self.get(job_id)
+            if existing is None or existing['status'] in PENDING_STATUSES:
+                return job_id
+            # Finished jobs are resubmittable; re-claim so concurrent resubmits still dedupe
+            self.cache.delete('job', job_id)
+            if not self.cache.add('job', job_id, '', record, ttl=IN_FLIGHT_TTL):
+                return job_id
+
+        self.cache.set('job_latest', scope, kind, job_id, ttl=RESULT_TTL)
+        with self._lock:
+            self._active += 1
+        self._executor.submit(self._run, record, fn, args, kwargs)
+        return job_id
+
+    def _run(self, record, fn, args, kwargs):
+        record['status'] = RUNNING
+        record['started_at'] = time.time()
+        self.cache.set('job', record['id'], '', record, ttl=IN_FLIGHT_TTL)
+        try:
+            result = fn(*args, **kwargs)
+            if result is None:
+                record['status'] = FAILED
+                record['error'] = 'No result returned'
+            else:
+                record['status'] = DONE
+                record['result'] = result
+        except Exception as e:
+            record['status'] = FAILED
+            record['error'] = str(e) or type(e).__name__
+        finally:
+            record['finished_at'] = time.time()
+            self.cache.set('job', record['id'], '', record, ttl=RESULT_TTL)
+            with self._lock:
+                self._active -= 1
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,553 @@
+"""Concurrent load test for PocketTrip.
+
+Drives many simulated sessions through the real Streamlit pages (via
+streamlit.testing's AppTest) against in-memory Supabase and Gemini fakes
+with configurable latency, then reports throughput, per-action latency
+percentiles and thread/memory usage for each concurrency level.
+
+    python loadtest.py --concurrency 1,5,10,20 --db-latency 0.02 --llm-latency 0.8
+"""
+import argparse
+import contextlib
+import copy
+import hashlib
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.util import patch_config_options
+
+import jobs
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+PASSWORD = 'loadtest123'
+LOCATIONS = {
+    "Mumbai, India": (19.0760, 72.8777),
+    "Pune, India": (18.5204, 73.8567),
+    "Bengaluru, India": (12.9716, 77.5946),
+    "Goa, India": (15.2993, 74.1240),
+    "Delhi, India": (28.6139, 77.2090)
+}
+EXPENSE_MESSAGES = [
+    "I paid ₹500 for tickets",
+    "Split ₹800 among 3 people",
+    "I paid ₹1200 for lunch, split among 4 people",
+    "What's everyone's balance?"
+]
+
+
+# Fake backends
+class Latency:
+    def __init__(self, mean, jitter):
+        self.mean = mean
+        self.jitter = jitter
+
+    def wait(self):
+        if self.mean > 0:
+            time.sleep(max(0.0, random.gauss(self.mean, self.mean * self.jitter)))
+
+
+class FakeResponse:
+    def __init__(self, data=None, text=None):
+        self.data = data
+        self.text = text
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.operation = 'select'
+        self.columns = '*'
+        self.payload = None
+        self.filters = []
+        self.order_by = None
+
+    def select(self, columns='*'):
+        self.operation, self.columns = 'select', columns
+        return self
+
+    def insert(self, data):
+        self.operation, self.payload = 'insert', data
+        return self
+
+    def update(self, data):
+        self.operation, self.payload = 'update', data
+        return self
+
+    def delete(self):
+        self.operation = 'delete'
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def execute(self):
+        self.db.latency.wait()
+        return FakeResponse(self.db.apply(self))
+
+
+class FakeSupabase:
+    # Just enough of the supabase-py query builder for main.py
+    def __init__(self, latency):
+        self.latency = latency
+        self.tables = defaultdict(list)
+        self.queries = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def _matches(self, row, filters):
+        return all(row.get(column) == value for column, value in filters)
+
+    def apply(self, query):
+        with self._lock:
+            self.queries += 1
+            rows = self.tables[query.table]
+            if query.operation == 'insert':
+                if query.table == 'users' and any(r['username'] == query.payload['username'] for r in rows):
+                    raise Exception("duplicate key value violates unique constraint \"users_username_key\"")
+                row = dict(query.payload, id=next(self._ids))
+                rows.append(row)
+                return [copy.deepcopy(row)]
+            matched = [r for r in rows if self._matches(r, query.filters)]
+            if query.operation == 'update':
+                for row in matched:
+                    row.update(query.payload)
+                return copy.deepcopy(matched)
+            if query.operation == 'delete':
+                self.tables[query.table] = [r for r in rows if r not in matched]
+                return copy.deepcopy(matched)
+            if query.order_by:
+                column, desc = query.order_by
+                matched = sorted(matched, key=lambda r: r.get(column) or '', reverse=desc)
+            if query.columns != '*':
+                columns = [c.strip() for c in query.columns.split(',')]
+                matched = [{c: r.get(c) for c in columns} for r in matched]
+            return copy.deepcopy(matched)
+
+
+class FakeGemini:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.calls += 1
+        self.latency.wait()
+        if "ONE-DAY trip plan" in prompt or "Combine these" in prompt:
+            return FakeResponse(text="```json\n" + json.dumps(self._plan(prompt)) + "\n```")
+        return FakeResponse(text="Got it! Everyone's share is ₹250. Rahul owes you ₹250.")
+
+    def _plan(self, prompt):
+        seed = int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16)
+        rng = random.Random(seed)
+        location = re.search(r"Current Location: (.*)", prompt)
+        lat, lon = LOCATIONS.get(location.group(1).strip() if location else None, (19.0760, 72.8777))
+        destinations = []
+        for slot in ("morning", "afternoon", "evening"):
+            costs = {"entry": rng.randint(0, 300), "food": rng.randint(100, 500), "transport": rng.randint(50, 300), "misc": 50}
+            destinations.append({
+                "name": f"Place {rng.randint(1, 500)}",
+                "address": "Somewhere",
+                "latitude": lat + rng.uniform(-0.1, 0.1),
+                "longitude": lon + rng.uniform(-0.1, 0.1),
+                "distance_km": rng.randint(1, 30),
+                "category": rng.choice(["nature", "food", "culture"]),
+                "time_slot": slot,
+                "duration": "2 hours",
+                "activities": ["Sightseeing"],
+                "costs": costs,
+                "total_cost": sum(costs.values()),
+                "transport_from_previous": {"mode": "Cab", "cost": costs["transport"], "time": "30 mins"}
+            })
+        total = sum(d["total_cost"] for d in destinations)
+        return {
+            "origin": {"latitude": lat, "longitude": lon},
+            "destinations": destinations,
+            "itinerary": {"morning": ["9:00 AM - Start"], "afternoon": ["1:00 PM - Lunch"], "evening": ["6:00 PM - Walk"]},
+            "total_budget": {"transport": 0, "food": 0, "activities": 0, "miscellaneous": 0, "total": total},
+            "tips": ["Carry cash"]
+        }
+
+
+@contextlib.contextmanager
+def concurrent_app_tests():
+    # AppTest installs a mock Runtime and patches config.get_option around
+    # every run, then undoes both afterwards; with sessions running
+    # concurrently those undo steps land in the middle of other runs. It also
+    # compiles the script afresh for every run, and concurrent compile() calls
+    # can fail on CPython 3.11. Install one runtime, config and script cache
+    # for the whole load test instead, which is also what a real worker
+    # process shares between its sessions.
+    runtime = mock.MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    script_cache = ScriptCache()
+    with mock.patch.object(Runtime, 'instance', classmethod(lambda cls: runtime)), \
+            mock.patch('streamlit.testing.v1.local_script_runner.ScriptCache', return_value=script_cache), \
+            mock.patch.object(Runtime, 'exists', classmethod(lambda cls: True)), \
+            patch_config_options({"global.appTest": True}), \
+            mock.patch('streamlit.testing.v1.app_test.patch_config_options', lambda overrides: contextlib.nullcontext()):
+        yield
+
+
+@contextlib.contextmanager
+def isolated_level(db, llm):
+    # main.py's st.cache_resource singletons (shared cache, job queue,
+    # knowledge base) outlive a level, so without this each level would start
+    # with the previous one's warm caches, job records and indexed places.
+    # Clearing them makes the next session build fresh ones against this
+    # level's backends and knowledge base file.
+    queues = []
+    make_queue = jobs.JobQueue
+
+    def tracked_queue(*args, **kwargs):
+        queue = make_queue(*args, **kwargs)
+        queues.append(queue)
+        return queue
+
+    with tempfile.TemporaryDirectory(prefix='pockettrip-loadtest-') as tmp, \
+            mock.patch.dict(os.environ, {'POCKETTRIP_PLACES_DB': os.path.join(tmp, 'places.db')}), \
+            mock.patch('jobs.JobQueue', side_effect=tracked_queue), \
+            mock.patch('supabase.create_client', return_value=db), \
+            mock.patch('google.generativeai.configure'), \
+            mock.patch('google.generativeai.GenerativeModel', return_value=llm):
+        st.cache_resource.clear()
+        try:
+            yield
+        finally:
+            # Stop the level's job workers so they don't count towards the next level's threads
+            for queue in queues:
+                queue.shutdown()
+            st.cache_resource.clear()
+
+
+# Simulated session
+class ActionFailed(Exception):
+    pass
+
+
+def find(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise ActionFailed(f"no widget labelled {label!r}")
+
+
+class Session:
+    def __init__(self, recorder, username, timeout, poll_interval):
+        self.recorder = recorder
+        self.username = username
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        # Every script run, whether from at.run() or a widget's .run(), goes
+        # through AppTest._run; counting them separates app cost from polling
+        self.reruns = 0
+        run_script = self.at._run
+
+        def counted_run(*args, **kwargs):
+            self.reruns += 1
+            return run_script(*args, **kwargs)
+        self.at._run = counted_run
+
+    def timed(self, action, fn):
+        start, reruns_before = time.perf_counter(), self.reruns
+        try:
+            fn()
+            if self.at.exception:
+                raise ActionFailed(self.at.exception[0].message)
+        except Exception as e:
+            self.recorder.record(action, time.perf_counter() - start, error=f"{type(e).__name__}: {e}",
+                                 reruns=self.reruns - reruns_before)
+            raise
+        self.recorder.record(action, time.perf_counter() - start, reruns=self.reruns - reruns_before)
+
+    def login(self):
+        def run():
+            self.at.run()
+            find(self.at.text_input, "Username").input(self.username)
+            find(self.at.text_input, "Password").input(PASSWORD)
+            find(self.at.button, "Login").click().run()
+            if not self.at.session_state.authenticated:
+                raise ActionFailed("login rejected")
+        self.timed('login', run)
+
+    def create_room(self, name, location):
+        def run():
+            find(self.at.text_input, "Trip Name").input(name)
+            find(self.at.text_input, "Starting Location").input(location)
+            find(self.at.button, "Create Room").click().run()
+        self.timed('create_room', run)
+        return self.at.session_state.current_room['room_code']
+
+    def join_room(self, room_code):
+        def run():
+            find(self.at.text_input, "Room Code").input(room_code)
+            find(self.at.button, "Join Room").click().run()
+            if self.at.session_state.page != 'planning':
+                raise ActionFailed(f"could not join {room_code}")
+        self.timed('join_room', run)
+
+    def generate_plan(self, budget):
+        def run():
+            find(self.at.number_input, "Your Budget ($)").set_value(budget)
+            find(self.at.button, "🚀 Generate My Plan").click().run()
+            # The plan is generated by a background job; a user can only wait
+            # and press "Check Status" now and then
+            deadline = time.monotonic() + self.timeout
+            while not any("Plan created" in s.value for s in self.at.success):
+                if any("Error generating plan" in e.value for e in self.at.error):
+                    raise ActionFailed(self.at.error[0].value)
+                if time.monotonic() > deadline:
+                    raise ActionFailed("plan job did not finish")
+                time.sleep(self.poll_interval)
+                check = [b for b in self.at.button if b.label == "🔄 Check Status"]
+                (check[0].click() if check else self.at).run()
+        self.timed('generate_plan', run)
+
+    def vote(self):
+        def run():
+            self.at.run()
+            buttons = [b for b in self.at.button if b.label == "👍 Vote"]
+            if not buttons:
+                raise ActionFailed("no plans to vote on")
+            random.choice(buttons).click().run()
+        self.timed('vote', run)
+
+    def post_expense(self, message):
+        def run():
+            if self.at.session_state.page != 'splitsense':
+                find(self.at.sidebar.button, "💸 SplitSense").click().run()
+            find(self.at.text_input, "Enter expense").input(message)
+            find(self.at.button, "Send").click().run()
+        self.timed('post_expense', run)
+
+    def calculate_split(self):
+        def run():
+            find(self.at.button, "📊 Calculate Split").click().run()
+        self.timed('calculate_split', run)
+
+
+# Metrics
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        # ru_maxrss is KB on Linux and bytes on macOS; this is only a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(list)
+        self.reruns = defaultdict(int)
+        self.peak_threads = threading.active_count()
+        self.peak_rss_mb = rss_mb()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+
+    def record(self, action, seconds, error=None, reruns=0):
+        with self._lock:
+            self.reruns[action] += reruns
+            if error:
+                self.errors[action].append(error)
+            else:
+                self.latencies[action].append(seconds)
+
+    def _sample(self):
+        while not self._stop.wait(0.05):
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_rss_mb = max(self.peak_rss_mb, rss_mb())
+
+    def __enter__(self):
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._sampler.join()
+
+    def summary(self):
+        actions = {}
+        for action in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies[action]
+            actions[action] = {
+                'count': len(values),
+                'errors': len(self.errors[action]),
+                'reruns_per_action': self.reruns[action] / ((len(values) + len(self.errors[action])) or 1),
+                'p50_ms': percentile(values, 50) * 1000,
+                'p95_ms': percentile(values, 95) * 1000,
+                'p99_ms': percentile(values, 99) * 1000
+            }
+        return actions
+
+
+# Scenario
+def run_member(recorder, run_id, room_index, member_index, rooms, options):
+    username = f"load{run_id}_r{room_index}_m{member_index}"
+    session = Session(recorder, username, options.timeout, options.poll_interval)
+    try:
+        session.login()
+        room = rooms[room_index]
+        if member_index == 0:
+            room['code'] = session.create_room(f"Load Room {room_index}", random.choice(list(LOCATIONS)))
+            room['ready'].set()
+        else:
+            if not room['ready'].wait(options.timeout):
+                raise ActionFailed("room was never created")
+            session.join_room(room['code'])
+        session.generate_plan(random.randrange(50, 2000, 10))
+        session.vote()
+        for message in random.sample(EXPENSE_MESSAGES, min(options.expenses, len(EXPENSE_MESSAGES))):
+            session.post_expense(message)
+        session.calculate_split()
+    except Exception:
+        # Already recorded against the failing action; the session stops there
+        pass
+
+
+def seed_users(db, run_id, sessions, room_size):
+    password = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    for index in range(sessions):
+        db.table('users').insert({
+            'username': f"load{run_id}_r{index // room_size}_m{index % room_size}",
+            'password': password,
+            'email': f"load{run_id}_{index}@example.com",
+            'created_at': '2024-01-01T00:00:00'
+        }).execute()
+
+
+def run_level(concurrency, options):
+    run_id = f"{concurrency}_{int(time.time() * 1000) % 100000}"
+    room_count = math.ceil(concurrency / options.room_size)
+    rooms = [{'code': None, 'ready': threading.Event()} for _ in range(room_count)]
+    db = FakeSupabase(Latency(0, 0))
+    llm = FakeGemini(Latency(options.llm_latency, options.jitter))
+    seed_users(db, run_id, concurrency, options.room_size)
+    db.latency, db.queries = Latency(options.db_latency, options.jitter), 0
+
+    recorder = Recorder()
+    with isolated_level(db, llm):
+        start = time.perf_counter()
+        with recorder, ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for index in range(concurrency):
+                pool.submit(run_member, recorder, run_id, index // options.room_size, index % options.room_size, rooms, options)
+        elapsed = time.perf_counter() - start
+
+    actions = recorder.summary()
+    completed = sum(a['count'] for a in actions.values())
+    return {
+        'concurrency': concurrency,
+        'rooms': room_count,
+        'elapsed_s': elapsed,
+        'actions_completed': completed,
+        'errors': sum(a['errors'] for a in actions.values()),
+        'throughput_per_s': completed / elapsed if elapsed else 0.0,
+        'db_queries': db.queries,
+        'llm_calls': llm.calls,
+        'peak_threads': recorder.peak_threads,
+        'peak_rss_mb': recorder.peak_rss_mb,
+        'actions': actions,
+        'sample_errors': {a: errs[:3] for a, errs in recorder.errors.items()}
+    }
+
+
+def print_report(result):
+    print(f"\n== concurrency {result['concurrency']} ({result['rooms']} rooms) ==")
+    print(f"elapsed {result['elapsed_s']:.2f}s | throughput {result['throughput_per_s']:.2f} actions/s | "
+          f"errors {result['errors']} | db queries {result['db_queries']} | llm calls {result['llm_calls']} | "
+          f"peak threads {result['peak_threads']} | peak rss {result['peak_rss_mb']:.0f} MB")
+    print(f"{'action':<16}{'count':>7}{'errors':>8}{'reruns':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for action, stats in result['actions'].items():
+        print(f"{action:<16}{stats['count']:>7}{stats['errors']:>8}{stats['reruns_per_action']:>8.1f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    for action, errors in result['sample_errors'].items():
+        for error in errors:
+            print(f"  ! {action}: {error}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test PocketTrip with simulated sessions and fake backends")
+    parser.add_argument('--concurrency', default='1,5,10', help="comma-separated concurrent session counts")
+    parser.add_argument('--room-size', type=int, default=4, help="sessions per room")
+    parser.add_argument('--expenses', type=int, default=2, help="expense messages posted per session")
+    parser.add_argument('--db-latency', type=float, default=0.02, help="mean Supabase query latency (s)")
+    parser.add_argument('--llm-latency', type=float, default=0.5, help="mean Gemini call latency (s)")
+    parser.add_argument('--jitter', type=float, default=0.25, help="latency standard deviation as a fraction of the mean")
+    parser.add_argument('--timeout', type=float, default=60, help="per-action timeout (s)")
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help="how often a waiting user presses Check Status (s)")
+    parser.add_argument('--json', help="also write results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    # Session threads here are plain worker threads, which Streamlit warns about
+    # (a filter, because Streamlit resets its loggers' levels once the runtime starts)
+    logging.getLogger('streamlit.runtime.scriptrunner.script_run_context').addFilter(
+        lambda record: 'missing ScriptRunContext' not in record.getMessage()
+    )
+    os.environ.setdefault('SUPABASE_URL', 'http://loadtest.invalid')
+    os.environ.setdefault('SUPABASE_KEY', 'loadtest')
+    os.environ.setdefault('GEMINI_API_KEY', 'loadtest')
+    # Keep the shared cache private so runs don't leak into a real deployment's;
+    # each level then gets its own in-memory cache and knowledge base (see isolated_level)
+    os.environ['POCKETTRIP_CACHE_URL'] = 'memory://'
+
+    results = []
+    with concurrent_app_tests():
+        for concurrency in [int(c) for c in options.concurrency.split(',') if c.strip()]:
+            result = run_level(concurrency, options)
+            print_report(result)
+            results.append(result)
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
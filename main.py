@@ -7,6 +7,10 @@ import os
 import hashlib
 import string
 import random
+import shared_cache
+import jobs
+import expense_parser
+import places_index
 
 # Page config
 st.set_page_config(
@@ -101,6 +105,8 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+MODEL_NAME = 'gemini-2.0-flash-exp'
+
 # Initialize Supabase
 @st.cache_resource
 def init_supabase():
@@ -124,13 +130,46 @@ def init_gemini():
             st.error("⚠️ Gemini API key not found. Please configure environment variables.")
             st.stop()
         genai.configure(api_key=api_key)
-        return genai.GenerativeModel('gemini-2.0-flash-exp')
+        return genai.GenerativeModel(MODEL_NAME)
     except Exception as e:
         st.error(f"Error initializing Gemini: {e}")
         st.stop()
 
+# Initialize shared cache (shared by all workers pointing at the same backend)
+# (show_spinner=False: these run on every rerun, and a spinner starts a timer thread even on a cache hit)
+@st.cache_resource(show_spinner=False)
+def init_shared_cache():
+    try:
+        return shared_cache.from_url(os.environ.get("POCKETTRIP_CACHE_URL"))
+    except Exception as e:
+        st.warning(f"Shared cache unavailable, falling back to in-process cache: {e}")
+        return shared_cache.SharedCache(shared_cache.MemoryBackend())
+
+# Initialize background job queue
+@st.cache_resource(show_spinner=False)
+def init_job_queue(_cache):
+    return jobs.JobQueue(_cache)
+
+# Initialize SplitSense local parser (answers common messages without Gemini)
+@st.cache_resource(show_spinner=False)
+def init_expense_fast_path():
+    return expense_parser.FastPath()
+
+# Initialize destination knowledge base
+@st.cache_resource(show_spinner=False)
+def init_place_index():
+    try:
+        return places_index.PlaceIndex()
+    except Exception as e:
+        st.warning(f"Destination knowledge base unavailable: {e}")
+        return None
+
 supabase: Client = init_supabase()
 model = init_gemini()
+cache = init_shared_cache()
+job_queue = init_job_queue(cache)
+expense_fast_path = init_expense_fast_path()
+place_index = init_place_index()
 
 # Helper Functions
 def hash_password(password):
@@ -139,6 +178,15 @@ def hash_password(password):
 def generate_room_code():
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
 
+def prompt_key(prompt):
+    return hashlib.sha256(f"{MODEL_NAME}:{prompt}".encode()).hexdigest()
+
+def get_user_profile(user_id):
+    def load():
+        user = supabase.table('users').select('id, username').eq('id', user_id).execute()
+        return user.data[0] if user.data else None
+    return cache.get_or_set('user', user_id, 'profile', load)
+
 def authenticate_user(username, password):
     try:
         response = supabase.table('users').select('*').eq('username', username).execute()
@@ -192,6 +240,8 @@ def join_room(room_code, user_id):
             if user_id not in members:
                 members.append(user_id)
                 supabase.table('rooms').update({'members': json.dumps(members)}).eq('id', room['id']).execute()
+                room['members'] = json.dumps(members)
+                cache.invalidate('room_members', room['id'])
             return room
         return None
     except Exception as e:
@@ -209,64 +259,74 @@ def get_user_rooms(user_id):
         st.error(f"Error fetching rooms: {e}")
         return []
 
+# Members, plans and expenses are cached and invalidated separately, so a
+# vote or a new expense only evicts the section it changed
 def get_room_members(room_id):
-    try:
+    def load():
         room = supabase.table('rooms').select('members').eq('id', room_id).execute()
         if room.data:
             member_ids = json.loads(room.data[0]['members'])
             members = []
             for mid in member_ids:
-                user = supabase.table('users').select('id, username').eq('id', mid).execute()
-                if user.data:
-                    members.append(user.data[0])
+                user = get_user_profile(mid)
+                if user:
+                    members.append(user)
             return members
         return []
+    try:
+        return cache.get_or_set('room_members', room_id, '', load)
     except Exception as e:
         return []
 
+# Runs on a job thread, where st.error output is dropped; errors propagate so the job records them
 def save_day_plan(user_id, room_id, plan_data):
-    try:
-        data = {
-            'user_id': user_id,
-            'room_id': room_id,
-            'plan_data': json.dumps(plan_data),
-            'votes': 0,
-            'created_at': datetime.now().isoformat()
-        }
-        response = supabase.table('day_plans').insert(data).execute()
-        return response.data[0] if response.data else None
-    except Exception as e:
-        st.error(f"Error saving plan: {e}")
-        return None
+    data = {
+        'user_id': user_id,
+        'room_id': room_id,
+        'plan_data': json.dumps(plan_data),
+        'votes': 0,
+        'created_at': datetime.now().isoformat()
+    }
+    response = supabase.table('day_plans').insert(data).execute()
+    cache.invalidate('room_plans', room_id)
+    return response.data[0] if response.data else None
 
 def get_room_plans(room_id):
-    try:
+    def load():
         response = supabase.table('day_plans').select('*').eq('room_id', room_id).order('created_at', desc=True).execute()
         if response.data:
             for plan in response.data:
-                user = supabase.table('users').select('username').eq('id', plan['user_id']).execute()
-                plan['username'] = user.data[0]['username'] if user.data else 'Unknown'
+                user = get_user_profile(plan['user_id'])
+                plan['username'] = user['username'] if user else 'Unknown'
         return response.data
+    try:
+        return cache.get_or_set('room_plans', room_id, '', load)
     except Exception as e:
         st.error(f"Error fetching plans: {e}")
         return []
 
-def vote_plan(plan_id, user_id):
+# Runs inside a button callback, where st.* output would land outside the
+# plan card; returns False for a repeat vote and lets errors propagate
+def vote_plan(plan_id, user_id, room_id=None):
+    vote_check = supabase.table('plan_votes').select('*').eq('plan_id', plan_id).eq('user_id', user_id).execute()
+    if vote_check.data:
+        return False
+    
+    supabase.table('plan_votes').insert({'plan_id': plan_id, 'user_id': user_id}).execute()
+    
+    plan = supabase.table('day_plans').select('votes').eq('id', plan_id).execute()
+    current_votes = plan.data[0]['votes'] if plan.data else 0
+    supabase.table('day_plans').update({'votes': current_votes + 1}).eq('id', plan_id).execute()
+    if room_id is not None:
+        cache.invalidate('room_plans', room_id)
+    return True
+
+def get_plan_votes(plan_id):
     try:
-        vote_check = supabase.table('plan_votes').select('*').eq('plan_id', plan_id).eq('user_id', user_id).execute()
-        if vote_check.data:
-            st.warning("You already voted for this plan!")
-            return False
-        
-        supabase.table('plan_votes').insert({'plan_id': plan_id, 'user_id': user_id}).execute()
-        
         plan = supabase.table('day_plans').select('votes').eq('id', plan_id).execute()
-        current_votes = plan.data[0]['votes'] if plan.data else 0
-        supabase.table('day_plans').update({'votes': current_votes + 1}).eq('id', plan_id).execute()
-        return True
-    except Exception as e:
-        st.error(f"Error voting: {e}")
-        return False
+        return plan.data[0]['votes'] if plan.data else 0
+    except Exception:
+        return 0
 
 def save_expense_message(room_id, user_id, message, response):
     try:
@@ -278,21 +338,26 @@ def save_expense_message(room_id, user_id, message, response):
             'created_at': datetime.now().isoformat()
         }
         supabase.table('split_expenses').insert(data).execute()
+        cache.invalidate('room_expenses', room_id)
     except Exception as e:
         st.error(f"Error saving expense: {e}")
 
 def get_room_expenses(room_id):
-    try:
+    def load():
         response = supabase.table('split_expenses').select('*').eq('room_id', room_id).order('created_at', desc=False).execute()
         if response.data:
             for exp in response.data:
-                user = supabase.table('users').select('username').eq('id', exp['user_id']).execute()
-                exp['username'] = user.data[0]['username'] if user.data else 'Unknown'
+                user = get_user_profile(exp['user_id'])
+                exp['username'] = user['username'] if user else 'Unknown'
         return response.data
+    try:
+        return cache.get_or_set('room_expenses', room_id, '', load)
     except Exception as e:
         return []
 
-def generate_day_plan(current_location, radius, budget, interests, additional_info):
+# Runs on a job thread: unexpected errors propagate so the job records the real message
+def generate_day_plan(current_location, radius, budget, interests, additional_info, known_places=None):
+    known = f"Places we already know near here (reuse them where they fit, and fill the remaining time slots): {', '.join(known_places)}" if known_places else ""
     prompt = f"""
     Create a detailed ONE-DAY trip plan with these parameters:
     Current Location: {current_location}
@@ -300,6 +365,7 @@ def generate_day_plan(current_location, radius, budget, interests, additional_in
     Budget: ₹{budget}
     Interests: {', '.join(interests)}
     Additional Info: {additional_info}
+    {known}
     
     Provide a JSON response with realistic costs in Indian Rupees (₹):
     1. Exact destinations within the radius with addresses
@@ -308,13 +374,17 @@ def generate_day_plan(current_location, radius, budget, interests, additional_in
     4. Precise cost estimates for each destination
     5. Travel time and transport costs between locations
     6. Practical tips
+    7. Latitude and longitude of the starting location and of every destination
     
     Format as valid JSON:
     {{
+        "origin": {{"latitude": 19.0760, "longitude": 72.8777}},
         "destinations": [
             {{
                 "name": "Place Name",
                 "address": "Full address",
+                "latitude": 18.9220,
+                "longitude": 72.8347,
                 "distance_km": 15,
                 "category": "nature/food/culture",
                 "time_slot": "morning/afternoon/evening",
@@ -352,6 +422,10 @@ def generate_day_plan(current_location, radius, budget, interests, additional_in
     Make sure to include realistic Indian prices and transport costs between each location.
     """
     
+    cached = cache.get('llm', 'day_plan', prompt_key(prompt))
+    if cached is not None:
+        return cached
+    
     try:
         response = model.generate_content(prompt)
         text = response.text
@@ -361,7 +435,15 @@ def generate_day_plan(current_location, radius, budget, interests, additional_in
         elif "```" in text:
             text = text.split("```")[1].split("```")[0]
         
-        return json.loads(text.strip())
+        plan = json.loads(text.strip())
+        cache.set('llm', 'day_plan', prompt_key(prompt), plan, ttl=86400)
+        # Only fresh model output is indexed; a cache hit would just inflate how often its places were seen
+        if place_index:
+            try:
+                place_index.add_plan(current_location, plan)
+            except Exception:
+                pass
+        return plan
     except json.JSONDecodeError:
         return {
             "destinations": [{
@@ -390,10 +472,8 @@ def generate_day_plan(current_location, radius, budget, interests, additional_in
             },
             "tips": ["Book in advance", "Check weather", "Carry cash"]
         }
-    except Exception as e:
-        st.error(f"Error generating plan: {e}")
-        return None
 
+# Runs on a job thread: errors propagate so the job records the real message
 def combine_plans(plans_data):
     prompt = f"""
     Combine these {len(plans_data)} day trip plans into one optimal merged plan:
@@ -410,6 +490,10 @@ def combine_plans(plans_data):
     Return JSON in the same format as individual plans.
     """
     
+    cached = cache.get('llm', 'combined_plan', prompt_key(prompt))
+    if cached is not None:
+        return cached
+    
     try:
         response = model.generate_content(prompt)
         text = response.text
@@ -419,10 +503,11 @@ def combine_plans(plans_data):
         elif "```" in text:
             text = text.split("```")[1].split("```")[0]
         
-        return json.loads(text.strip())
-    except Exception as e:
-        st.error(f"Error combining plans: {e}")
-        return None
+        combined = json.loads(text.strip())
+        cache.set('llm', 'combined_plan', prompt_key(prompt), combined, ttl=86400)
+        return combined
+    except json.JSONDecodeError:
+        raise ValueError("The model did not return a valid plan") from None
 
 def process_expense_split(message, room_expenses_context):
     prompt = f"""
@@ -448,6 +533,129 @@ def process_expense_split(message, room_expenses_context):
     except Exception as e:
         return f"Error processing: {str(e)}"
 
+# Background Jobs
+def day_plan_job(user_id, room_id, current_location, radius, budget, interests, additional_info):
+    plan, known = None, []
+    # Free-text requirements need the model, so only plain requests use the knowledge base
+    if place_index and not additional_info:
+        try:
+            plan, known = place_index.assemble_plan(current_location, radius, budget, interests)
+        except Exception:
+            plan, known = None, []
+    if not plan:
+        plan = generate_day_plan(current_location, radius, budget, interests, additional_info or "None",
+                                 known_places=[p['name'] for p in known])
+        if not plan:
+            raise ValueError("The model did not return a plan")
+    plan['user_preferences'] = {
+        'radius': radius,
+        'budget': budget,
+        'interests': interests,
+        'additional_info': additional_info
+    }
+    saved = save_day_plan(user_id, room_id, plan)
+    if not saved:
+        raise RuntimeError("The plan could not be saved")
+    return {'plan_id': saved['id']}
+
+def show_job_status(job, pending_message, failed_message, key):
+    if not job or job['status'] not in jobs.PENDING_STATUSES + (jobs.FAILED,):
+        return
+    if job['status'] == jobs.FAILED:
+        st.error(f"{failed_message}: {job['error']}")
+        return
+    st.info(f"⏳ {pending_message} ({job['status']})")
+    if st.button("🔄 Check Status", key=key):
+        st.rerun()
+
+# Fragments (re-render on their own, without re-running the whole page)
+@st.fragment(run_every=30)
+def room_members_section(room_id):
+    st.markdown("### 👥 Room Members")
+    members = get_room_members(room_id)
+    for member in members:
+        st.markdown(f'<div class="member-badge">👤 {member["username"]}</div>', unsafe_allow_html=True)
+
+# The outcome is kept in session state for plan_card to show next to the button
+def cast_vote(plan_id, user_id, room_id):
+    try:
+        if vote_plan(plan_id, user_id, room_id):
+            st.session_state[f"votes_{plan_id}"] = get_plan_votes(plan_id)
+        else:
+            st.session_state[f"vote_msg_{plan_id}"] = ('warning', "You already voted for this plan!")
+    except Exception as e:
+        st.session_state[f"vote_msg_{plan_id}"] = ('error', f"Error voting: {e}")
+
+@st.fragment
+def plan_card(plan, room_id):
+    plan_data = json.loads(plan['plan_data'])
+    votes_key = f"votes_{plan['id']}"
+    # plan comes from the page's last full run; votes only go up, so the newer count wins
+    votes = max(plan['votes'], st.session_state.get(votes_key, 0))
+    
+    # The label carries the vote count, so keep the expander open after a vote changes it
+    with st.expander(f"🗺️ {plan['username']}'s Plan - Votes: {votes}", expanded=votes_key in st.session_state):
+        col_a, col_b = st.columns([3, 1])
+        
+        with col_a:
+            if plan_data.get('source') == 'knowledge_base':
+                st.caption("⚡ Assembled instantly from places other groups have explored nearby")
+            if 'destinations' in plan_data:
+                st.markdown("**Destinations:**")
+                for dest in plan_data['destinations']:
+                    st.markdown(f"📍 **{dest['name']}** ({dest.get('distance_km', '?')} km)")
+                    st.caption(f"Time: {dest.get('time_slot', 'TBD')} | Cost: ₹{dest.get('total_cost', 0)}")
+            
+            if 'total_budget' in plan_data:
+                st.markdown("**Budget Breakdown:**")
+                budget = plan_data['total_budget']
+                cols = st.columns(len(budget))
+                for idx, (cat, amt) in enumerate(budget.items()):
+                    cols[idx].metric(cat.title(), f"₹{amt}")
+        
+        with col_b:
+            # Voting runs as a callback, before the card re-renders with the new count
+            st.button("👍 Vote", key=f"vote_{plan['id']}", use_container_width=True,
+                      on_click=cast_vote, args=(plan['id'], st.session_state.user['id'], room_id))
+            vote_msg = st.session_state.pop(f"vote_msg_{plan['id']}", None)
+            if vote_msg:
+                kind, text = vote_msg
+                if kind == 'error':
+                    st.error(text)
+                else:
+                    st.warning(text)
+
+@st.fragment
+def expense_chat(room_id):
+    # History is filled in after the form so a new message shows up in this same run
+    history = st.container()
+    
+    with st.form("expense_form", clear_on_submit=True):
+        message = st.text_input("Enter expense", placeholder="I paid ₹500 for lunch, split among 4 people")
+        send = st.form_submit_button("Send", use_container_width=True)
+        
+        if send and message:
+            with st.spinner("Processing..."):
+                expenses = get_room_expenses(room_id)
+                member_names = [m['username'] for m in get_room_members(room_id)]
+                # Posting a plan or an expense shows a member was in the room by then
+                activity = [(e['username'], e['created_at']) for e in expenses] + \
+                    [(p['username'], p['created_at']) for p in get_room_plans(room_id)]
+                past_messages = [
+                    (e['username'], e['message'], expense_parser.members_at(member_names, activity, e['created_at']))
+                    for e in expenses
+                ]
+                response = expense_fast_path.respond(message, st.session_state.user['username'], member_names, past_messages)
+                if response is None:
+                    context = [{'user': e['username'], 'message': e['message'], 'response': e['response']} for e in expenses]
+                    response = process_expense_split(message, context)
+                save_expense_message(room_id, st.session_state.user['id'], message, response)
+    
+    with history:
+        for exp in get_room_expenses(room_id):
+            st.markdown(f'<div class="chat-user"><strong>{exp["username"]}:</strong><br>{exp["message"]}</div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="chat-assistant"><strong>SplitSense AI:</strong><br>{exp["response"]}</div>', unsafe_allow_html=True)
+
 # Session State
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
@@ -577,10 +785,7 @@ def planning_page():
             st.rerun()
         
         st.divider()
-        st.markdown("### 👥 Room Members")
-        members = get_room_members(room['id'])
-        for member in members:
-            st.markdown(f'<div class="member-badge">👤 {member["username"]}</div>', unsafe_allow_html=True)
+        room_members_section(room['id'])
         
         st.divider()
         if st.button("💸 SplitSense", use_container_width=True, type="primary"):
@@ -609,19 +814,23 @@ def planning_page():
             generate = st.form_submit_button("🚀 Generate My Plan", use_container_width=True)
             
             if generate and interests:
-                with st.spinner("Creating your plan..."):
-                    plan = generate_day_plan(room['current_location'], radius, budget, interests, additional_info or "None")
-                    if plan:
-                        plan['user_preferences'] = {
-                            'radius': radius,
-                            'budget': budget,
-                            'interests': interests,
-                            'additional_info': additional_info
-                        }
-                        saved = save_day_plan(st.session_state.user['id'], room['id'], plan)
-                        if saved:
-                            st.success("Plan created! Check 'All Plans' tab.")
-                            st.rerun()
+                user_id = st.session_state.user['id']
+                params = {
+                    'user_id': user_id,
+                    'radius': radius,
+                    'budget': budget,
+                    'interests': interests,
+                    'additional_info': additional_info
+                }
+                st.session_state['plan_job'] = job_queue.submit(
+                    'day_plan', room['id'], params, day_plan_job,
+                    user_id, room['id'], room['current_location'], radius, budget, interests, additional_info
+                )
+        
+        plan_job = job_queue.get(st.session_state.get('plan_job'))
+        if plan_job and plan_job['status'] == jobs.DONE:
+            st.success("Plan created! Check 'All Plans' tab.")
+        show_job_status(plan_job, "Creating your plan in the background", "Error generating plan", "plan_job_status")
     
     with tab2:
         st.markdown("### All Member Plans")
@@ -629,30 +838,7 @@ def planning_page():
         
         if plans:
             for plan in plans:
-                plan_data = json.loads(plan['plan_data'])
-                
-                with st.expander(f"🗺️ {plan['username']}'s Plan - Votes: {plan['votes']}", expanded=False):
-                    col_a, col_b = st.columns([3, 1])
-                    
-                    with col_a:
-                        if 'destinations' in plan_data:
-                            st.markdown("**Destinations:**")
-                            for dest in plan_data['destinations']:
-                                st.markdown(f"📍 **{dest['name']}** ({dest.get('distance_km', '?')} km)")
-                                st.caption(f"Time: {dest.get('time_slot', 'TBD')} | Cost: ₹{dest.get('total_cost', 0)}")
-                        
-                        if 'total_budget' in plan_data:
-                            st.markdown("**Budget Breakdown:**")
-                            budget = plan_data['total_budget']
-                            cols = st.columns(len(budget))
-                            for idx, (cat, amt) in enumerate(budget.items()):
-                                cols[idx].metric(cat.title(), f"₹{amt}")
-                    
-                    with col_b:
-                        if st.button("👍 Vote", key=f"vote_{plan['id']}", use_container_width=True):
-                            if vote_plan(plan['id'], st.session_state.user['id']):
-                                st.success("Voted!")
-                                st.rerun()
+                plan_card(plan, room['id'])
         else:
             st.info("No plans yet. Create one in the 'Create Plan' tab!")
     
@@ -662,15 +848,16 @@ def planning_page():
         
         if len(plans) >= 2:
             if st.button("🔄 Combine All Plans", use_container_width=True, type="primary"):
-                with st.spinner("Merging everyone's ideas..."):
-                    plans_data = [json.loads(p['plan_data']) for p in plans]
-                    combined = combine_plans(plans_data)
-                    if combined:
-                        st.session_state['combined_plan'] = combined
-                        st.rerun()
+                plans_data = [json.loads(p['plan_data']) for p in plans]
+                params = {'plan_ids': sorted(p['id'] for p in plans)}
+                job_queue.submit('combine', room['id'], params, combine_plans, plans_data)
+            
+            # The latest merge for the room is shared, so every member sees it
+            combine_job = job_queue.latest('combine', room['id'])
+            show_job_status(combine_job, "Merging everyone's ideas", "Error combining plans", "combine_job_status")
             
-            if 'combined_plan' in st.session_state:
-                combined = st.session_state['combined_plan']
+            if combine_job and combine_job['status'] == jobs.DONE:
+                combined = combine_job['result']
                 
                 if 'destinations' in combined:
                     st.markdown("### 🗺️ Merged Destinations")
@@ -701,27 +888,13 @@ def splitsense_page():
     
     with col1:
         st.markdown("### 💬 Expense Chat")
-        
-        expenses = get_room_expenses(room['id'])
-        for exp in expenses:
-            st.markdown(f'<div class="chat-user"><strong>{exp["username"]}:</strong><br>{exp["message"]}</div>', unsafe_allow_html=True)
-            st.markdown(f'<div class="chat-assistant"><strong>SplitSense AI:</strong><br>{exp["response"]}</div>', unsafe_allow_html=True)
-        
-        with st.form("expense_form", clear_on_submit=True):
-            message = st.text_input("Enter expense", placeholder="I paid ₹500 for lunch, split among 4 people")
-            send = st.form_submit_button("Send", use_container_width=True)
-            
-            if send and message:
-                with st.spinner("Processing..."):
-                    context = [{'user': e['username'], 'message': e['message'], 'response': e['response']} for e in expenses]
-                    response = process_expense_split(message, context)
-                    save_expense_message(room['id'], st.session_state.user['id'], message, response)
-                    st.rerun()
+        expense_chat(room['id'])
         
         st.divider()
         
         # Calculate Split Button
         if st.button("📊 Calculate Split", use_container_width=True, type="primary"):
+            expenses = get_room_expenses(room['id'])
             if expenses:
                 with st.spinner("Calculating final splits..."):
                     # Get all room members
@@ -746,7 +919,10 @@ def splitsense_page():
                     Format it clearly with proper headings and use ₹ symbol for all amounts.
                     """
                     
-                    final_split = model.generate_content(split_prompt).text
+                    final_split = cache.get('llm', 'final_split', prompt_key(split_prompt))
+                    if final_split is None:
+                        final_split = model.generate_content(split_prompt).text
+                        cache.set('llm', 'final_split', prompt_key(split_prompt), final_split, ttl=86400)
                     st.session_state['final_split'] = final_split
                     st.rerun()
         
@@ -763,18 +939,19 @@ def splitsense_page():
     with col2:
         st.markdown("### 💡 Quick Guide")
         st.info("💬 Examples:\n\n- 'I paid ₹500 for tickets'\n- 'Split ₹800 among 3 people'\n- 'Rahul owes me ₹250'\n- 'What's everyone's balance?'")
+        fast_path_stats = expense_fast_path.stats()
+        if fast_path_stats['local'] + fast_path_stats['fallback']:
+            st.caption(f"⚡ {fast_path_stats['hit_rate']:.0%} of messages answered instantly without AI")
         
         # Show member list
-        st.markdown("### 👥 Room Members")
-        members = get_room_members(room['id'])
-        for member in members:
-            st.markdown(f'<div class="member-badge">👤 {member["username"]}</div>', unsafe_allow_html=True)
+        room_members_section(room['id'])
         
         st.divider()
         
         if st.button("🗑️ Clear All Expenses", use_container_width=True):
             try:
                 supabase.table('split_expenses').delete().eq('room_id', room['id']).execute()
+                cache.invalidate('room_expenses', room['id'])
                 if 'final_split' in st.session_state:
                     st.session_state['final_split'] = None
                 st.success("All expenses cleared!")
@@ -0,0 +1,264 @@
+"""Geo-indexed knowledge base of destinations from earlier generated plans.
+
+Every generated plan teaches us real places around its starting location.
+They are stored in SQLite under a geohash of their coordinates, along with
+their category, time slot and cost, so a later request for the same area can
+be answered by picking one place per time slot out of the index instead of
+asking Gemini to rediscover them.
+"""
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from itertools import product
+
+TIME_SLOTS = ('morning', 'afternoon', 'evening')
+SLOT_TIMES = {'morning': '9:00 AM', 'afternoon': '1:00 PM', 'evening': '6:00 PM'}
+EARTH_RADIUS_KM = 6371.0
+CANDIDATES_PER_SLOT = 5
+
+# The form's interests mapped to the categories the model tends to use
+INTEREST_CATEGORIES = {
+    'nature': {'nature', 'park', 'beach', 'hiking', 'outdoors'},
+    'food': {'food', 'restaurant', 'cafe', 'street food'},
+    'culture': {'culture', 'museum', 'art', 'temple', 'religious'},
+    'adventure': {'adventure', 'hiking', 'trekking', 'sports'},
+    'history': {'history', 'heritage', 'fort', 'culture', 'museum'},
+    'shopping': {'shopping', 'market'},
+    'photography': {'photography', 'viewpoint', 'nature', 'heritage'},
+    'relaxation': {'relaxation', 'beach', 'spa', 'park'}
+}
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Approximate cell height/width in km for each geohash precision
+_CELL_KM = {1: 5000, 2: 1250, 3: 156, 4: 39, 5: 4.9, 6: 1.2}
+
+
+def geohash_encode(lat, lon, precision=6):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlambda = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def covering_cells(lat, lon, radius_km):
+    # Pick the finest precision whose cells are still at least as big as the
+    # radius, then walk the bounding box in half-cell steps. Even precisions
+    # have cells half as tall as they are wide, which half-cell steps still cover
+    precision = max(p for p, size in _CELL_KM.items() if size >= radius_km or p == 1)
+    # Cells span a fixed number of degrees, so step in degrees too
+    step_deg = _CELL_KM[precision] / 111.0 / 2
+    lat_delta = radius_km / 111.0
+    lon_delta = min(180.0, radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01)))
+    lat_steps = int(2 * lat_delta / step_deg) + 1
+    lon_steps = int(2 * lon_delta / step_deg) + 1
+    cells = set()
+    for i in range(lat_steps + 1):
+        cell_lat = max(-90.0, min(90.0, lat - lat_delta + i * 2 * lat_delta / lat_steps))
+        for j in range(lon_steps + 1):
+            cell_lon = lon - lon_delta + j * 2 * lon_delta / lon_steps
+            cell_lon = (cell_lon + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(cell_lat, cell_lon, precision))
+    return sorted(cells)
+
+
+def normalize_location(location):
+    return re.sub(r'\s+', ' ', (location or '').strip().lower())
+
+
+def _coordinates(item):
+    try:
+        lat, lon = float(item['latitude']), float(item['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+class PlaceIndex:
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('POCKETTRIP_PLACES_DB') or \
+            os.path.join(tempfile.gettempdir(), 'pockettrip_places.db')
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS origins (location TEXT PRIMARY KEY, latitude REAL NOT NULL, "
+            "longitude REAL NOT NULL, tips TEXT, updated_at REAL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS places (name_key TEXT NOT NULL, geohash TEXT NOT NULL, name TEXT NOT NULL, "
+            "latitude REAL NOT NULL, longitude REAL NOT NULL, category TEXT, time_slot TEXT, total_cost REAL, "
+            "data TEXT NOT NULL, seen INTEGER NOT NULL DEFAULT 1, updated_at REAL, PRIMARY KEY (name_key, geohash))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS places_geohash ON places (geohash)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def origin(self, location):
+        row = self._conn().execute(
+            "SELECT latitude, longitude, tips FROM origins WHERE location = ?", (normalize_location(location),)
+        ).fetchone()
+        return (row[0], row[1], json.loads(row[2] or '[]')) if row else None
+
+    def add_plan(self, location, plan):
+        # Returns how many destinations were indexed; places without usable
+        # coordinates (including the offline fallback plan) are skipped
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            origin = _coordinates(plan.get('origin') or {})
+            if origin:
+                conn.execute(
+                    "INSERT OR REPLACE INTO origins (location, latitude, longitude, tips, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (normalize_location(location), origin[0], origin[1], json.dumps(plan.get('tips', [])), now)
+                )
+            indexed = 0
+            for dest in plan.get('destinations', []):
+                coords = _coordinates(dest)
+                if not coords or not dest.get('name'):
+                    continue
+                slot = (dest.get('time_slot') or '').lower()
+                conn.execute(
+                    "INSERT INTO places (name_key, geohash, name, latitude, longitude, category, time_slot, total_cost, data, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(name_key, geohash) DO UPDATE SET seen = seen + 1, category = excluded.category, "
+                    "time_slot = excluded.time_slot, total_cost = excluded.total_cost, data = excluded.data, "
+                    "updated_at = excluded.updated_at",
+                    (
+                        normalize_location(dest['name']), geohash_encode(*coords), dest['name'], coords[0], coords[1],
+                        (dest.get('category') or '').lower(), slot if slot in TIME_SLOTS else None,
+                        float(dest.get('total_cost') or 0), json.dumps(dest), now
+                    )
+                )
+                indexed += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return indexed
+
+    def nearby(self, lat, lon, radius_km):
+        conn = self._conn()
+        places = []
+        for cell in covering_cells(lat, lon, radius_km):
+            rows = conn.execute(
+                "SELECT name, latitude, longitude, category, time_slot, total_cost, data, seen FROM places "
+                "WHERE geohash >= ? AND geohash < ?", (cell, cell + '~')
+            ).fetchall()
+            for name, p_lat, p_lon, category, slot, cost, data, seen in rows:
+                distance = haversine_km(lat, lon, p_lat, p_lon)
+                if distance <= radius_km:
+                    places.append({
+                        'name': name, 'category': category, 'time_slot': slot, 'total_cost': cost,
+                        'distance_km': round(distance, 1), 'seen': seen, 'data': json.loads(data)
+                    })
+        return places
+
+    def assemble_plan(self, location, radius, budget, interests):
+        # Returns a plan in the same shape generate_day_plan produces, or
+        # (None, partial picks) when the area isn't covered well enough: a slot
+        # with no place matching the interests is a gap, and so is an interest
+        # none of the picks cover
+        origin = self.origin(location)
+        if not origin:
+            return None, []
+        lat, lon, tips = origin
+        wanted = {interest.lower(): INTEREST_CATEGORIES.get(interest.lower(), {interest.lower()}) for interest in interests}
+        matching = set().union(*wanted.values())
+
+        by_slot = {slot: [] for slot in TIME_SLOTS}
+        for place in self.nearby(lat, lon, radius):
+            if place['time_slot'] in by_slot and (not wanted or place['category'] in matching):
+                by_slot[place['time_slot']].append(place)
+
+        # Partial picks become hints in the model prompt, so they must not vary
+        # between identical requests or the prompt would miss the LLM cache
+        best, covered = self._pick(by_slot, budget, wanted, noise=0.0)
+        if len(best) < len(TIME_SLOTS) or covered < len(wanted):
+            return None, best
+        # A day served straight from the index can vary, so repeated requests
+        # don't always get the identical plan
+        varied, covered = self._pick(by_slot, budget, wanted, noise=0.3)
+        if len(varied) == len(TIME_SLOTS) and covered == len(wanted):
+            best = varied
+        return self._build_plan(best, tips), best
+
+    @staticmethod
+    def _pick(by_slot, budget, wanted, noise):
+        # Returns the best affordable picks (at most one per slot) and how many
+        # interests they cover. Popularity ranks candidates; ties go by name
+        ranked = {}
+        for slot in TIME_SLOTS:
+            scored = [(min(p['seen'], 5) * 0.1 + random.random() * noise, p) for p in by_slot[slot]]
+            scored.sort(key=lambda item: (-item[0], item[1]['name']))
+            ranked[slot] = scored[:CANDIDATES_PER_SLOT]
+
+        best, best_score, best_covered = [], None, 0
+        # Any slot may stay empty, so an over-budget day still yields partial picks
+        for combo in product(*(ranked[slot] + [None] for slot in TIME_SLOTS)):
+            picked = [p for _, p in filter(None, combo)]
+            if len({p['name'] for p in picked}) < len(picked):
+                continue
+            if sum(p['total_cost'] for p in picked) > budget:
+                continue
+            categories = {p['category'] for p in picked}
+            covered = sum(1 for cats in wanted.values() if cats & categories)
+            score = (len(picked), covered, sum(score for score, _ in filter(None, combo)))
+            if best_score is None or score > best_score:
+                best, best_score, best_covered = picked, score, covered
+        return best, best_covered
+
+    @staticmethod
+    def _build_plan(picked, tips):
+        destinations, itinerary = [], {slot: [] for slot in TIME_SLOTS}
+        totals = {'transport': 0.0, 'food': 0.0, 'activities': 0.0, 'miscellaneous': 0.0}
+        for place in picked:
+            dest = dict(place['data'], distance_km=place['distance_km'])
+            destinations.append(dest)
+            itinerary[place['time_slot']].append(f"{SLOT_TIMES[place['time_slot']]} - {place['name']}")
+            costs = dest.get('costs') or {}
+            totals['transport'] += float(costs.get('transport') or 0)
+            totals['food'] += float(costs.get('food') or 0)
+            totals['activities'] += float(costs.get('entry') or 0)
+            totals['miscellaneous'] += float(costs.get('misc') or 0)
+        totals['total'] = sum(totals.values())
+        return {
+            'destinations': destinations,
+            'itinerary': itinerary,
+            'total_budget': {k: round(v) for k, v in totals.items()},
+            'tips': tips or ["Check opening hours before you set out", "Carry cash for local transport"],
+            'source': 'knowledge_base'
+        }
@@ -0,0 +1,474 @@
+"""Shared cache tier used by every Streamlit worker.
+
+st.cache_resource and st.session_state live inside one process, so when the
+app runs as several workers behind a load balancer each one repeats the same
+Supabase reads and Gemini calls. Values stored here are visible to all
+workers pointing at the same backend.
+
+Keys are versioned twice: CACHE_VERSION covers the shape of cached values,
+and each (namespace, scope) pair carries a generation counter that writers
+bump with invalidate(), which orphans every key cached under the old
+generation without having to enumerate them.
+"""
+import json
+import os
+import socket
+import socketserver
+import sqlite3
+import ssl
+import tempfile
+import threading
+import time
+from urllib.parse import unquote, urlparse
+
+CACHE_VERSION = 1
+DEFAULT_TTL = 600
+
+
+# Backends
+class MemoryBackend:
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key):
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            return True
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._live(key) or 0) + 1
+            self._data[key] = (str(value), None)
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteBackend:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        # Keys orphaned by invalidate() are never read again, so sweep them on startup
+        self.purge_expired()
+
+    def _conn(self):
+        # sqlite3 connections cannot be shared across threads, and Streamlit
+        # runs every session on its own script thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] <= time.time():
+            self.delete(key)
+            return None
+        return row[0]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at)
+        )
+
+    def add(self, key, value, ttl=None):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM kv WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl if ttl else None)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def incr(self, key):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, '1', NULL) "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+                (key,)
+            )
+            value = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return int(value)
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        self._conn().execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+
+class RedisError(Exception):
+    pass
+
+
+def _encode_command(*args):
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+    return b"".join(parts)
+
+
+def _read_reply(f):
+    line = f.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload.decode()
+    if kind == b'-':
+        raise RedisError(payload.decode())
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length == -1:
+            return None
+        data = f.read(length + 2)
+        return data[:-2].decode()
+    if kind == b'*':
+        length = int(payload)
+        if length == -1:
+            return None
+        return [_read_reply(f) for _ in range(length)]
+    raise RedisError(f"unexpected reply: {line!r}")
+
+
+class RedisBackend:
+    # Speaks RESP directly so any Redis-compatible server (Redis, Valkey,
+    # KeyDB, LocalRedisServer below) works without an extra client dependency
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=2.0, username=None, use_ssl=False):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.use_ssl = use_ssl
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        if self.use_ssl:
+            # AUTH carries the password, so rediss:// must never fall back to plain TCP
+            try:
+                sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+            except Exception:
+                sock.close()
+                raise
+        f = sock.makefile('rb')
+        self._local.sock, self._local.file = sock, f
+        try:
+            if self.password:
+                # Redis 6 ACL users log in with AUTH <username> <password>
+                if self.username:
+                    self._send('AUTH', self.username, self.password)
+                else:
+                    self._send('AUTH', self.password)
+            if self.db:
+                self._send('SELECT', self.db)
+        except Exception:
+            # Never keep a connection that isn't logged in or on the right db;
+            # the next call reconnects
+            self.close()
+            raise
+
+    def _send(self, *args):
+        self._local.sock.sendall(_encode_command(*args))
+        return _read_reply(self._local.file)
+
+    def execute(self, *args):
+        if getattr(self._local, 'sock', None) is None:
+            self._connect()
+        try:
+            return self._send(*args)
+        except (OSError, ConnectionError):
+            # One retry on a fresh connection covers servers that dropped idle clients
+            self.close()
+            self._connect()
+            return self._send(*args)
+
+    def close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = self._local.file = None
+
+    def get(self, key):
+        return self.execute('GET', key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self.execute('SET', key, value, 'EX', int(ttl))
+        else:
+            self.execute('SET', key, value)
+
+    def add(self, key, value, ttl=None):
+        if ttl:
+            return self.execute('SET', key, value, 'NX', 'EX', int(ttl)) == 'OK'
+        return self.execute('SET', key, value, 'NX') == 'OK'
+
+    def incr(self, key):
+        return self.execute('INCR', key)
+
+    def delete(self, key):
+        self.execute('DEL', key)
+
+
+# Local stand-in for Redis, for development and tests
+class _RedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        store = self.server.store
+        self.authenticated = self.server.password is None
+        while True:
+            try:
+                request = _read_reply(self.rfile)
+            except (ConnectionError, OSError, ValueError):
+                return
+            if not isinstance(request, list) or not request:
+                return
+            command, args = request[0].upper(), request[1:]
+            try:
+                reply = self.dispatch(store, command, args)
+            except ValueError:
+                reply = RedisError("ERR value is not an integer or out of range")
+            self.wfile.write(self.encode(reply))
+
+    def dispatch(self, store, command, args):
+        if command == 'PING':
+            return 'PONG'
+        if command == 'AUTH':
+            username, password = args if len(args) == 2 else ('default', args[0])
+            self.authenticated = (username, password) == (self.server.username, self.server.password)
+            return 'OK' if self.authenticated else RedisError("WRONGPASS invalid username-password pair")
+        if not self.authenticated:
+            return RedisError("NOAUTH Authentication required.")
+        if command in ('SELECT', 'FLUSHDB'):
+            if command == 'FLUSHDB':
+                with store._lock:
+                    store._data.clear()
+            return 'OK'
+        if command == 'GET':
+            return store.get(args[0])
+        if command == 'SET':
+            options = [arg.upper() for arg in args[2:]]
+            ttl = int(args[2 + options.index('EX') + 1]) if 'EX' in options else None
+            if 'NX' in options:
+                return 'OK' if store.add(args[0], args[1], ttl) else None
+            store.set(args[0], args[1], ttl)
+            return 'OK'
+        if command == 'INCR':
+            return store.incr(args[0])
+        if command == 'DEL':
+            with store._lock:
+                removed = sum(1 for key in args if store._data.pop(key, None) is not None)
+            return removed
+        return RedisError(f"ERR unknown command '{command}'")
+
+    @staticmethod
+    def encode(reply):
+        if isinstance(reply, RedisError):
+            return f"-{reply}\r\n".encode()
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, int):
+            return f":{reply}\r\n".encode()
+        if reply in ('OK', 'PONG'):
+            return f"+{reply}\r\n".encode()
+        data = reply.encode()
+        return f"${len(data)}\r\n".encode() + data + b"\r\n"
+
+
+class LocalRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    # With a password set, clients must AUTH first, as with requirepass or an ACL user
+    def __init__(self, host='127.0.0.1', port=0, username='default', password=None):
+        super().__init__((host, port), _RedisHandler)
+        self.store = MemoryBackend()
+        self.username = username
+        self.password = password
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def backend_from_url(url):
+    parsed = urlparse(url)
+    if parsed.scheme in ('redis', 'rediss'):
+        db = int(parsed.path.lstrip('/') or 0)
+        return RedisBackend(
+            parsed.hostname or 'localhost', parsed.port or 6379, db,
+            password=unquote(parsed.password) if parsed.password else None,
+            username=unquote(parsed.username) if parsed.username else None,
+            use_ssl=parsed.scheme == 'rediss'
+        )
+    if parsed.scheme == 'sqlite':
+        path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else parsed.path
+        return SQLiteBackend(path or os.path.join(tempfile.gettempdir(), 'pockettrip_cache.db'))
+    if parsed.scheme == 'memory':
+        return MemoryBackend()
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+
+# Versioned, invalidation-aware view over a backend
+class SharedCache:
+    def __init__(self, backend, prefix='pockettrip', version=CACHE_VERSION, default_ttl=DEFAULT_TTL):
+        self.backend = backend
+        self.prefix = f"{prefix}:v{version}"
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _generation_key(self, namespace, scope):
+        return f"{self.prefix}:gen:{namespace}:{scope}"
+
+    def _key(self, namespace, scope, key):
+        generation = self.backend.get(self._generation_key(namespace, scope)) or '0'
+        return f"{self.prefix}:{namespace}:{scope}:g{generation}:{key}"
+
+    # A failing cache must never take the app down, so every backend error
+    # is counted and treated as a miss
+    def get(self, namespace, scope, key=''):
+        try:
+            raw = self.backend.get(self._key(namespace, scope, key))
+        except Exception:
+            self._count('errors')
+            raw = None
+        if raw is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return json.loads(raw)
+
+    def set(self, namespace, scope, key='', value=None, ttl=None):
+        try:
+            self.backend.set(self._key(namespace, scope, key), json.dumps(value), ttl or self.default_ttl)
+        except Exception:
+            self._count('errors')
+
+    # Atomic set-if-absent; lets workers claim work without double-running it.
+    # If the backend is down the caller is told it won, so the work still runs
+    def add(self, namespace, scope, key='', value=None, ttl=None):
+        try:
+            return self.backend.add(self._key(namespace, scope, key), json.dumps(value), ttl or self.default_ttl)
+        except Exception:
+            self._count('errors')
+            return True
+
+    def delete(self, namespace, scope, key=''):
+        try:
+            self.backend.delete(self._key(namespace, scope, key))
+        except Exception:
+            self._count('errors')
+
+    def invalidate(self, namespace, scope):
+        try:
+            self.backend.incr(self._generation_key(namespace, scope))
+        except Exception:
+            self._count('errors')
+
+    # Resolves the generation once, before loading: if a writer invalidates
+    # while loader() runs, the possibly stale value lands under the old
+    # generation, where nobody will read it
+    def get_or_set(self, namespace, scope, key, loader, ttl=None):
+        try:
+            full_key = self._key(namespace, scope, key)
+            raw = self.backend.get(full_key)
+        except Exception:
+            self._count('errors')
+            full_key = raw = None
+        if raw is not None:
+            self._count('hits')
+            return json.loads(raw)
+        self._count('misses')
+        value = loader()
+        if value is not None and full_key is not None:
+            try:
+                self.backend.set(full_key, json.dumps(value), ttl or self.default_ttl)
+            except Exception:
+                self._count('errors')
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+def from_url(url=None, **kwargs):
+    url = url or os.environ.get('POCKETTRIP_CACHE_URL') or \
+        'sqlite:///' + os.path.join(tempfile.gettempdir(), 'pockettrip_cache.db')
+    return SharedCache(backend_from_url(url), **kwargs)
@@ -0,0 +1,237 @@
+import pytest
+
+from expense_parser import (
+    BALANCE, DEBT, PAYMENT, SETTLEMENT, DEFAULT_THRESHOLD, FastPath, compute_balances, extract_amounts,
+    format_inr, members_at, parse_message, settle
+)
+
+MEMBERS = ['Shriya', 'Rahul', 'Priya']
+
+
+def parse(message, sender='Shriya', members=MEMBERS):
+    return parse_message(message, sender, members)
+
+
+# Quick Guide examples
+def test_i_paid_for_tickets():
+    parsed = parse("I paid ₹500 for tickets")
+    assert parsed.intent == PAYMENT
+    assert parsed.amount == 500
+    assert parsed.payer == 'Shriya'
+    assert parsed.participants == MEMBERS
+    assert parsed.description == 'tickets'
+    assert parsed.confidence == 0.95
+
+
+def test_split_among_whole_room():
+    parsed = parse("Split ₹800 among 3 people", sender='Rahul')
+    assert parsed.intent == PAYMENT
+    assert parsed.amount == 800
+    assert parsed.payer == 'Rahul'
+    assert parsed.participants == MEMBERS
+    assert parsed.confidence == 0.9
+
+
+def test_owes_me():
+    parsed = parse("Rahul owes me ₹250")
+    assert parsed.intent == DEBT
+    assert parsed.amount == 250
+    assert (parsed.debtor, parsed.creditor) == ('Rahul', 'Shriya')
+    assert parsed.confidence == 0.95
+
+
+def test_balance_question():
+    parsed = parse("What's everyone's balance?")
+    assert parsed.intent == BALANCE
+    assert parsed.confidence == 0.95
+
+
+# README examples
+def test_named_payer():
+    parsed = parse("Rahul paid ₹300 for cab", sender='Priya')
+    assert parsed.intent == PAYMENT
+    assert (parsed.payer, parsed.amount, parsed.description) == ('Rahul', 300, 'cab')
+    assert parsed.participants == MEMBERS
+    assert parsed.confidence == 0.95
+
+
+def test_split_equally():
+    parsed = parse("Split ₹800 equally")
+    assert (parsed.intent, parsed.payer, parsed.amount) == (PAYMENT, 'Shriya', 800)
+    assert parsed.participants == MEMBERS
+    assert parsed.confidence == 0.9
+
+
+def test_head_count_that_is_not_the_room_is_unsure():
+    parsed = parse("I paid ₹500 for lunch, split among 4 people")
+    assert parsed.amount == 500
+    assert parsed.confidence == 0.5
+
+
+def test_split_with_named_members():
+    parsed = parse("I paid ₹900 for dinner with Rahul")
+    assert parsed.participants == ['Shriya', 'Rahul']
+    assert parsed.amount == 900
+    assert parsed.confidence == 0.85
+
+
+# Repayments are settlements, not group expenses
+@pytest.mark.parametrize('message', ["Rahul paid me ₹200", "Rahul gave me ₹200", "Rahul paid me back ₹200",
+                                     "Rahul sent ₹200 to me"])
+def test_money_received_from_member(message):
+    parsed = parse(message)
+    assert parsed.intent == SETTLEMENT
+    assert (parsed.payer, parsed.recipient, parsed.amount) == ('Rahul', 'Shriya', 200)
+    assert parsed.participants == []
+    assert parsed.confidence == 0.95
+
+
+@pytest.mark.parametrize('message', ["I paid Rahul ₹200", "I gave ₹200 to Rahul", "I paid Rahul back ₹200"])
+def test_money_sent_to_member(message):
+    parsed = parse(message)
+    assert parsed.intent == SETTLEMENT
+    assert (parsed.payer, parsed.recipient, parsed.amount) == ('Shriya', 'Rahul', 200)
+    assert parsed.confidence == 0.95
+
+
+def test_possessive_is_not_a_recipient():
+    parsed = parse("I paid Rahul's cab fare ₹300")
+    assert parsed.intent == PAYMENT
+    assert parsed.confidence < DEFAULT_THRESHOLD
+
+
+def test_paying_a_non_member_is_an_expense():
+    parsed = parse("I paid ₹500 to the restaurant")
+    assert parsed.intent == PAYMENT
+    assert parsed.participants == MEMBERS
+
+
+def test_repayment_settles_the_payer():
+    history = [('Shriya', "I paid ₹600 for tickets"), ('Shriya', "Rahul paid me ₹200")]
+    balances = compute_balances(history, MEMBERS)
+    assert balances == {'Shriya': 200, 'Rahul': 0, 'Priya': -200}
+    assert settle(balances) == [('Priya', 'Shriya', 200)]
+
+
+@pytest.mark.parametrize('message', ["I spent ₹200 on my own shopping", "₹200 personal shopping, I paid",
+                                     "I paid ₹200 for myself", "I bought a ₹200 souvenir for myself"])
+def test_personal_spending_is_unsure(message):
+    parsed = parse(message)
+    assert parsed is None or parsed.confidence < DEFAULT_THRESHOLD
+
+
+@pytest.mark.parametrize('message', ["Rahul paid for me ₹200", "Rahul covered my lunch ₹200",
+                                     "Rahul bought me a coffee for ₹150", "Rahul spent ₹300 on my ticket",
+                                     "Rahul paid ₹200 for dinner with me"])
+def test_someone_paying_for_the_sender_is_unsure(message):
+    parsed = parse(message)
+    assert parsed.payer == 'Rahul'
+    assert parsed.confidence < DEFAULT_THRESHOLD
+
+
+def test_sender_in_a_group_expense_is_not_singled_out():
+    parsed = parse("Rahul paid ₹300 for cab, split among 3 people including me")
+    assert parsed.confidence == 0.95
+    assert parse("Rahul paid ₹300 for everyone including me").confidence == 0.95
+
+
+@pytest.mark.parametrize('message, description', [
+    ("Rahul paid for me ₹200", None),
+    ("Rahul bought me a coffee for ₹150", None),
+    ("Rahul paid for me ₹200 for dinner", 'dinner'),
+    ("I paid for tickets ₹500", 'tickets'),
+    ("I paid ₹850 for Gateway of India tickets", 'Gateway of India tickets')
+])
+def test_description_skips_pronouns_and_amounts(message, description):
+    assert parse(message).description == description
+
+
+@pytest.mark.parametrize('message', ["I paid ₹500 except Priya", "I paid ₹300, Rahul got refunded", "I paid half of ₹600",
+                                     "I paid ₹100 each", "Split ₹300 but not with Priya"])
+def test_hedged_messages_are_unsure(message):
+    assert parse(message).confidence < DEFAULT_THRESHOLD
+
+
+def test_unparsed_messages():
+    assert parse("Where should we eat tonight?") is None
+    assert parse("I paid ₹200 and Rahul paid ₹300") is None
+    assert parse("Arjun paid ₹300 for cab") is None
+    assert parse("Rahul owes Rahul ₹100") is None
+
+
+def test_amounts():
+    assert extract_amounts("I paid ₹1,250.50 for dinner") == ([1250.5], True)
+    assert extract_amounts("Rs. 2k for the hotel") == ([2000], True)
+    assert extract_amounts("300 rupees for fuel") == ([300], True)
+    assert extract_amounts("I paid 450 for cab, split among 3 people") == ([450], False)
+    assert parse("I paid 450 for cab").confidence == 0.7
+
+
+def test_format_inr():
+    assert format_inr(1200) == '₹1,200'
+    assert format_inr(283.333) == '₹283.33'
+
+
+def test_ledger_with_unparsed_expense_is_unknown():
+    history = [('Shriya', "I paid ₹600 for tickets"), ('Rahul', "Paid something like 400 for food I think")]
+    assert compute_balances(history, MEMBERS) is None
+
+
+def test_fast_path_answers_repayment_with_balances():
+    fast_path = FastPath()
+    reply = fast_path.respond("Rahul paid me ₹200", 'Shriya', MEMBERS, [('Shriya', "I paid ₹600 for tickets")])
+    assert reply.startswith("Noted! Rahul paid Shriya ₹200.")
+    assert "- Rahul is settled up" in reply
+    assert "- Shriya gets back ₹200" in reply
+    assert fast_path.stats()['by_intent'] == {SETTLEMENT: 1}
+
+
+def test_fast_path_falls_back_when_unsure():
+    fast_path = FastPath()
+    assert fast_path.respond("I spent ₹200 on my own shopping", 'Shriya', MEMBERS, []) is None
+    assert fast_path.respond("What's everyone's balance?", 'Shriya', MEMBERS,
+                             [('Shriya', "I paid ₹500 except Priya")]) is None
+    assert fast_path.stats()['fallback'] == 2
+
+
+# Room membership
+def test_members_at_uses_join_order():
+    activity = [('Shriya', '2024-05-01T10:00:00'), ('Priya', '2024-05-01T12:00:00')]
+    assert members_at(MEMBERS, activity, '2024-05-01T09:00:00') == []
+    assert members_at(MEMBERS, activity, '2024-05-01T10:00:00') == ['Shriya']
+    # Priya joined after Rahul, so Rahul was in the room once Priya was active
+    assert members_at(MEMBERS, activity, '2024-05-01T12:30:00') == MEMBERS
+    assert members_at(MEMBERS, [('Arjun', '2024-05-01T08:00:00')], '2024-05-01T12:00:00') == []
+
+
+def test_late_joiner_is_not_charged_for_earlier_expenses():
+    history = [
+        ('Shriya', "I paid ₹600 for tickets", ['Shriya', 'Rahul']),
+        ('Priya', "Priya paid ₹300 for snacks", MEMBERS)
+    ]
+    assert compute_balances(history, MEMBERS) is None
+
+
+def test_named_split_before_late_joiner_still_counts():
+    history = [
+        ('Shriya', "I paid ₹600 for tickets with Rahul", ['Shriya', 'Rahul']),
+        ('Rahul', "Rahul owes Priya ₹100", ['Shriya', 'Rahul']),
+        ('Priya', "I paid ₹300 for snacks", MEMBERS)
+    ]
+    assert compute_balances(history, MEMBERS) == {'Shriya': 200, 'Rahul': -500, 'Priya': 300}
+
+
+def test_whole_room_expense_after_everyone_joined():
+    history = [
+        ('Priya', "Priya paid ₹300 for snacks", MEMBERS),
+        ('Shriya', "I paid ₹600 for tickets", MEMBERS)
+    ]
+    assert compute_balances(history, MEMBERS) == {'Shriya': 300, 'Rahul': -300, 'Priya': 0}
+
+
+def test_fast_path_skips_balances_when_membership_is_unknown():
+    fast_path = FastPath()
+    history = [('Shriya', "I paid ₹600 for tickets", ['Shriya'])]
+    assert fast_path.respond("What's everyone's balance?", 'Shriya', MEMBERS, history) is None
+    reply = fast_path.respond("Rahul paid me ₹200", 'Shriya', MEMBERS, history)
+    assert reply == "Noted! Rahul paid Shriya ₹200."
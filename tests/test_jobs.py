@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+import jobs
+from jobs import JobQueue
+from shared_cache import MemoryBackend, SharedCache
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(SharedCache(MemoryBackend()), max_workers=2)
+    yield queue
+    queue.shutdown()
+
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job and job['status'] not in jobs.PENDING_STATUSES:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"{job_id} did not finish")
+
+
+def test_job_id_depends_on_kind_scope_and_params():
+    job_id = JobQueue.job_id('day_plan', 'room-1', {'budget': 2000, 'radius': 10})
+    assert job_id.startswith('day_plan-')
+    assert job_id == JobQueue.job_id('day_plan', 'room-1', {'radius': 10, 'budget': 2000})
+    assert job_id != JobQueue.job_id('day_plan', 'room-2', {'budget': 2000, 'radius': 10})
+    assert job_id != JobQueue.job_id('combine', 'room-1', {'budget': 2000, 'radius': 10})
+
+
+def test_runs_job_and_stores_result(queue):
+    job_id = queue.submit('day_plan', 'room-1', {'budget': 2000}, lambda budget: {'total': budget}, 2000)
+    job = wait_for(queue, job_id)
+    assert job['status'] == jobs.DONE
+    assert job['result'] == {'total': 2000}
+    assert job['error'] is None
+    assert job['started_at'] and job['finished_at']
+    assert queue.latest('day_plan', 'room-1')['id'] == job_id
+    assert queue.active_count() == 0
+
+
+def test_duplicate_submit_while_in_flight_runs_once(queue):
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {'ok': True}
+
+    first = queue.submit('combine', 'room-1', {'plan_ids': [1, 2]}, work)
+    second = queue.submit('combine', 'room-1', {'plan_ids': [1, 2]}, work)
+    assert first == second
+    assert queue.get(first)['status'] in jobs.PENDING_STATUSES
+    release.set()
+    assert wait_for(queue, first)['status'] == jobs.DONE
+    assert len(calls) == 1
+
+
+def test_concurrent_submits_run_once(queue):
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {'ok': True}
+
+    ids = []
+    threads = [
+        threading.Thread(target=lambda: ids.append(queue.submit('combine', 'room-1', {}, work)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    release.set()
+    assert len(set(ids)) == 1
+    wait_for(queue, ids[0])
+    assert len(calls) == 1
+
+
+def test_resubmit_after_done_runs_again(queue):
+    results = iter([{'version': 1}, {'version': 2}])
+    job_id = queue.submit('combine', 'room-1', {}, lambda: next(results))
+    assert wait_for(queue, job_id)['result'] == {'version': 1}
+    assert queue.submit('combine', 'room-1', {}, lambda: next(results)) == job_id
+    assert wait_for(queue, job_id)['result'] == {'version': 2}
+
+
+def test_resubmit_after_failure_runs_again(queue):
+    def fail():
+        raise ValueError("Gemini quota exceeded")
+
+    job_id = queue.submit('day_plan', 'room-1', {}, fail)
+    job = wait_for(queue, job_id)
+    assert job['status'] == jobs.FAILED
+    assert job['error'] == "Gemini quota exceeded"
+
+    queue.submit('day_plan', 'room-1', {}, lambda: {'plan_id': 7})
+    job = wait_for(queue, job_id)
+    assert job['status'] == jobs.DONE
+    assert job['result'] == {'plan_id': 7}
+    assert job['error'] is None
+
+
+def test_failure_without_message_records_exception_type(queue):
+    def fail():
+        raise KeyError
+
+    job = wait_for(queue, queue.submit('day_plan', 'room-1', {}, fail))
+    assert job['status'] == jobs.FAILED
+    assert job['error'] == 'KeyError'
+    assert queue.active_count() == 0
+
+
+def test_none_result_is_a_failure(queue):
+    job = wait_for(queue, queue.submit('day_plan', 'room-1', {}, lambda: None))
+    assert job['status'] == jobs.FAILED
+    assert job['error'] == 'No result returned'
+
+
+def test_latest_tracks_most_recent_job_per_scope(queue):
+    first = queue.submit('day_plan', 'room-1', {'budget': 1000}, lambda: {'n': 1})
+    wait_for(queue, first)
+    second = queue.submit('day_plan', 'room-1', {'budget': 2000}, lambda: {'n': 2})
+    wait_for(queue, second)
+    assert queue.latest('day_plan', 'room-1')['id'] == second
+    assert queue.latest('day_plan', 'room-2') is None
+    assert queue.get(None) is None
@@ -0,0 +1,117 @@
+import pytest
+
+from places_index import PlaceIndex, covering_cells, geohash_encode, haversine_km
+
+MUMBAI = (19.0760, 72.8777)
+
+
+def place(name, category, slot, cost=300, offset=0.01):
+    return {
+        'name': name, 'category': category, 'time_slot': slot, 'total_cost': cost,
+        'latitude': MUMBAI[0] + offset, 'longitude': MUMBAI[1] + offset,
+        'costs': {'entry': cost / 3, 'food': cost / 3, 'transport': cost / 3, 'misc': 0}
+    }
+
+
+def plan(*destinations):
+    return {
+        'origin': {'latitude': MUMBAI[0], 'longitude': MUMBAI[1]},
+        'destinations': list(destinations),
+        'tips': ["Carry cash"]
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    return PlaceIndex(str(tmp_path / 'places.db'))
+
+
+def test_geohash_and_distance():
+    assert geohash_encode(57.64911, 10.40744, 6) == 'u4pruy'
+    assert haversine_km(*MUMBAI, 18.5204, 73.8567) == pytest.approx(120, abs=5)
+    assert geohash_encode(*MUMBAI, 5) in covering_cells(*MUMBAI, 3)
+
+
+def test_add_plan_skips_places_without_coordinates(index):
+    no_coords = {'name': 'Somewhere', 'category': 'food', 'time_slot': 'morning'}
+    assert index.add_plan('Mumbai, India', plan(place('Juhu Beach', 'beach', 'evening'), no_coords)) == 1
+    assert index.origin('  mumbai,   India ') == (MUMBAI[0], MUMBAI[1], ["Carry cash"])
+
+
+def test_nearby_filters_by_radius_and_counts_repeats(index):
+    index.add_plan('Mumbai, India', plan(place('Juhu Beach', 'beach', 'evening'), place('Lonavala', 'nature', 'morning', offset=0.5)))
+    index.add_plan('Mumbai, India', plan(place('Juhu Beach', 'beach', 'evening')))
+    nearby = index.nearby(*MUMBAI, 10)
+    assert [(p['name'], p['seen']) for p in nearby] == [('Juhu Beach', 2)]
+
+
+def test_assembles_plan_that_covers_interests(index):
+    index.add_plan('Mumbai, India', plan(
+        place('Sanjay Gandhi National Park', 'nature', 'morning'),
+        place('Mohammed Ali Road', 'food', 'afternoon'),
+        place('Juhu Beach', 'beach', 'evening')
+    ))
+    result, picked = index.assemble_plan('Mumbai, India', 20, 2000, ['Nature', 'Food'])
+    assert result['source'] == 'knowledge_base'
+    assert [d['name'] for d in result['destinations']] == ['Sanjay Gandhi National Park', 'Mohammed Ali Road', 'Juhu Beach']
+    assert result['itinerary']['afternoon'] == ["1:00 PM - Mohammed Ali Road"]
+    assert result['total_budget']['total'] == 900
+    assert len(picked) == 3
+
+
+def test_slot_without_matching_place_is_a_gap(index):
+    index.add_plan('Mumbai, India', plan(
+        place('Sanjay Gandhi National Park', 'nature', 'morning'),
+        place('Mohammed Ali Road', 'food', 'afternoon'),
+        place('Phoenix Mall', 'shopping', 'evening')
+    ))
+    result, picked = index.assemble_plan('Mumbai, India', 20, 2000, ['Nature', 'Food'])
+    assert result is None
+    assert [p['name'] for p in picked] == ['Sanjay Gandhi National Park', 'Mohammed Ali Road']
+
+
+def test_uncovered_interest_falls_back(index):
+    index.add_plan('Mumbai, India', plan(
+        place('Mohammed Ali Road', 'food', 'morning'),
+        place('Bademiya', 'restaurant', 'afternoon'),
+        place('Leopold Cafe', 'cafe', 'evening')
+    ))
+    result, picked = index.assemble_plan('Mumbai, India', 20, 2000, ['Nature', 'Food'])
+    assert result is None
+    assert len(picked) == 3
+    result, _ = index.assemble_plan('Mumbai, India', 20, 2000, ['Food'])
+    assert result is not None
+
+
+def test_budget_and_unknown_origin(index):
+    index.add_plan('Mumbai, India', plan(
+        place('Park', 'nature', 'morning', cost=900),
+        place('Market', 'food', 'afternoon', cost=900),
+        place('Beach', 'beach', 'evening', cost=900)
+    ))
+    result, picked = index.assemble_plan('Mumbai, India', 20, 2000, ['Nature', 'Food'])
+    assert result is None
+    assert len(picked) == 2
+    assert index.assemble_plan('Pune, India', 20, 2000, ['Nature']) == (None, [])
+
+
+def test_partial_picks_are_the_same_for_identical_requests(index):
+    index.add_plan('Mumbai, India', plan(*(place(f"Park {i}", 'nature', 'morning', offset=0.001 * i) for i in range(8))))
+    index.add_plan('Mumbai, India', plan(place('Park 5', 'nature', 'morning', offset=0.005)))
+    hints = {
+        tuple(p['name'] for p in index.assemble_plan('Mumbai, India', 20, 2000, ['Nature'])[1])
+        for _ in range(20)
+    }
+    assert hints == {('Park 5',)}
+
+
+def test_full_days_from_the_index_vary(index):
+    index.add_plan('Mumbai, India', plan(*(
+        place(f"{slot.title()} Spot {i}", 'nature', slot, offset=0.001 * i)
+        for slot in ('morning', 'afternoon', 'evening') for i in range(3)
+    )))
+    days = {
+        tuple(d['name'] for d in index.assemble_plan('Mumbai, India', 20, 2000, ['Nature'])[0]['destinations'])
+        for _ in range(20)
+    }
+    assert len(days) > 1